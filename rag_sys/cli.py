@@ -3,8 +3,6 @@ import sys
 import logging
 from dotenv import load_dotenv
 
-from rag_sys.interactive import InteractiveRAG
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,8 +27,11 @@ def main():
     # Check for default documents path
     default_docs_path = os.getenv("RAG_DOCS_PATH")
     
-    # Start interactive session
+    # Start interactive session; imported here so startup errors above
+    # are reported before the heavy dependency chain loads
     try:
+        from rag_sys.interactive import InteractiveRAG
+
         interactive_rag = InteractiveRAG(api_key, default_docs_path)
         interactive_rag.cmdloop()
     except Exception as e:
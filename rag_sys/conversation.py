@@ -1,6 +1,8 @@
 import sqlite3
 import json
 import logging
+import threading
+import zlib
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass
@@ -8,6 +10,33 @@ from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# Version prefix for compressed message blobs; plain-text JSON rows written
+# by older versions carry no prefix and are still readable
+_COMPRESSED_PREFIX = b'\x01'
+
+
+def _encode_messages(serialized: str) -> bytes:
+    """Compress a serialized message list for storage"""
+    return _COMPRESSED_PREFIX + zlib.compress(serialized.encode('utf-8'))
+
+
+def _decode_messages(stored) -> List[Dict]:
+    """Decode a stored messages column, compressed or legacy plain JSON"""
+    if isinstance(stored, bytes):
+        if stored[:1] == _COMPRESSED_PREFIX:
+            stored = zlib.decompress(stored[1:])
+        stored = stored.decode('utf-8')
+    return json.loads(stored)
+
+
+def _messages_fts_text(stored) -> str:
+    """Plain-text form of a stored messages column for the search index"""
+    if isinstance(stored, bytes):
+        if stored[:1] == _COMPRESSED_PREFIX:
+            return zlib.decompress(stored[1:]).decode('utf-8')
+        return stored.decode('utf-8')
+    return stored
+
 @dataclass
 class Conversation:
     """Represents a conversation with metadata"""
@@ -23,20 +52,38 @@ class ConversationStore:
     
     def __init__(self, db_path: str = "conversations.db"):
         self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
         self._init_db()
 
-    @contextmanager
-    def _get_connection(self):
-        """Context manager for database connections"""
+    def _connect(self) -> sqlite3.Connection:
+        """Open the long-lived connection and apply performance pragmas"""
         conn = sqlite3.connect(
             self.db_path,
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False
         )
         conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        # WAL avoids an fsync per write and lets readers proceed during
+        # writes; the remaining pragmas trade a little durability and RAM
+        # for far less per-statement disk traffic
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        return conn
+
+    @contextmanager
+    def _get_connection(self):
+        """Context manager serializing access to the shared connection"""
+        with self._lock:
+            yield self._conn
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
 
     def _init_db(self):
         """Initialize the database schema"""
@@ -51,26 +98,142 @@ class ConversationStore:
                     summary TEXT
                 )
             """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conv_last_updated
+                ON conversations(last_updated DESC)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conv_title_nocase
+                ON conversations(title COLLATE NOCASE)
+            """)
+            self._fts_enabled = self._init_fts(conn)
             conn.commit()
 
+    def _init_fts(self, conn) -> bool:
+        """Set up the FTS5 search index, returning False if FTS5 is unavailable
+
+        The index is a standalone FTS5 table keyed by conversation id and
+        kept in sync by the store's write methods: messages are stored
+        compressed, so database triggers cannot index them directly.
+        """
+        try:
+            existing = conn.execute("""
+                SELECT sql FROM sqlite_master
+                WHERE type = 'table' AND name = 'conversations_fts'
+            """).fetchone()
+
+            if existing and "content=" in existing['sql']:
+                # Migrate from the older trigger-synced external-content
+                # schema, which cannot index compressed message blobs
+                conn.execute("DROP TABLE conversations_fts")
+                for trigger in ('insert', 'delete', 'update'):
+                    conn.execute(f"DROP TRIGGER IF EXISTS conversations_fts_{trigger}")
+                existing = None
+
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts
+                USING fts5(title, messages, summary)
+            """)
+
+            if existing is None:
+                # Index rows that predate the FTS table
+                for row in conn.execute("SELECT id, title, messages, summary FROM conversations"):
+                    conn.execute("""
+                        INSERT INTO conversations_fts(rowid, title, messages, summary)
+                        VALUES (?, ?, ?, ?)
+                    """, (row['id'], row['title'],
+                          _messages_fts_text(row['messages']), row['summary'] or ""))
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, falling back to LIKE search: {e}")
+            return False
+
     def create_conversation(self, title: str) -> int:
         """Create a new conversation and return its ID"""
         with self._get_connection() as conn:
             cursor = conn.execute("""
                 INSERT INTO conversations (title, start_time, last_updated, messages, summary)
                 VALUES (?, ?, ?, ?, ?)
-            """, (title, datetime.now(), datetime.now(), "[]", ""))
+            """, (title, datetime.now(), datetime.now(), _encode_messages("[]"), ""))
+            conv_id = cursor.lastrowid
+            if self._fts_enabled:
+                conn.execute("""
+                    INSERT INTO conversations_fts(rowid, title, messages, summary)
+                    VALUES (?, ?, '', '')
+                """, (conv_id, title))
+            conn.commit()
+            return conv_id
+
+    def update_conversation(self, conv_id: int, messages, summary: str = None):
+        """Update an existing conversation; a None summary keeps the stored one
+
+        ``messages`` is either a message list or a pre-serialized JSON
+        string, letting callers that already maintain a serialized history
+        skip re-dumping it on every turn.
+        """
+        serialized = messages if isinstance(messages, str) else json.dumps(messages)
+        with self._get_connection() as conn:
+            conn.execute("""
+                UPDATE conversations
+                SET messages = ?, last_updated = ?, summary = COALESCE(?, summary)
+                WHERE id = ?
+            """, (_encode_messages(serialized), datetime.now(), summary, conv_id))
+            self._update_fts(conn, conv_id, serialized, summary)
             conn.commit()
-            return cursor.lastrowid
 
-    def update_conversation(self, conv_id: int, messages: List[Dict], summary: str = None):
-        """Update an existing conversation"""
+    def update_summary(self, conv_id: int, summary: str):
+        """Update only a conversation's summary, leaving messages untouched
+
+        Used by background summarization: messages may have been persisted
+        again while the summary was being generated, so writing them back
+        from the summarizer's snapshot would lose the newer turns.
+        """
         with self._get_connection() as conn:
             conn.execute("""
+                UPDATE conversations SET summary = ? WHERE id = ?
+            """, (summary, conv_id))
+            if self._fts_enabled:
+                conn.execute("""
+                    UPDATE conversations_fts SET summary = ? WHERE rowid = ?
+                """, (summary, conv_id))
+            conn.commit()
+
+    def _update_fts(self, conn, conv_id: int, serialized: str, summary: Optional[str]):
+        """Mirror a conversation update into the search index"""
+        if not self._fts_enabled:
+            return
+        if summary is None:
+            conn.execute("""
+                UPDATE conversations_fts SET messages = ? WHERE rowid = ?
+            """, (serialized, conv_id))
+        else:
+            conn.execute("""
+                UPDATE conversations_fts SET messages = ?, summary = ? WHERE rowid = ?
+            """, (serialized, summary, conv_id))
+
+    def bulk_update(self, updates: List[Tuple[int, List[Dict], str]]):
+        """Update many conversations inside a single transaction
+
+        Each update is a (conv_id, messages, summary) tuple. Batching the
+        writes into one BEGIN/COMMIT pays the fsync cost once instead of
+        once per conversation.
+        """
+        if not updates:
+            return
+        now = datetime.now()
+        serialized = [(conv_id, json.dumps(messages), summary)
+                      for conv_id, messages, summary in updates]
+        rows = [(_encode_messages(payload), now, summary, conv_id)
+                for conv_id, payload, summary in serialized]
+        with self._get_connection() as conn:
+            conn.execute("BEGIN")
+            conn.executemany("""
                 UPDATE conversations
                 SET messages = ?, last_updated = ?, summary = ?
                 WHERE id = ?
-            """, (json.dumps(messages), datetime.now(), summary, conv_id))
+            """, rows)
+            for conv_id, payload, summary in serialized:
+                self._update_fts(conn, conv_id, payload, summary)
             conn.commit()
 
     def get_conversation(self, conv_id: int) -> Optional[Conversation]:
@@ -86,7 +249,7 @@ class ConversationStore:
                     title=row['title'],
                     start_time=row['start_time'],
                     last_updated=row['last_updated'],
-                    messages=json.loads(row['messages']),
+                    messages=_decode_messages(row['messages']),
                     summary=row['summary']
                 )
         return None
@@ -101,12 +264,55 @@ class ConversationStore:
                 LIMIT ? OFFSET ?
             """, (limit, offset)).fetchall()
 
-    def search_conversations(self, query: str) -> List[Tuple[int, str, datetime, str]]:
-        """Search conversations by content or summary"""
+    def search_conversations(self, query: str, limit: int = 50) -> List[Tuple[int, str, datetime, str]]:
+        """Search conversations by title, content or summary"""
         with self._get_connection() as conn:
-            return conn.execute("""
-                SELECT id, title, last_updated, summary
-                FROM conversations
-                WHERE title LIKE ? OR messages LIKE ? OR summary LIKE ?
-                ORDER BY last_updated DESC
-            """, (f"%{query}%", f"%{query}%", f"%{query}%")).fetchall()
\ No newline at end of file
+            if self._fts_enabled:
+                # Quote the query so user punctuation isn't parsed as FTS syntax
+                match = '"' + query.replace('"', '""') + '"'
+                return conn.execute("""
+                    SELECT c.id, c.title, c.last_updated, c.summary
+                    FROM conversations_fts f
+                    JOIN conversations c ON c.id = f.rowid
+                    WHERE conversations_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                """, (match, limit)).fetchall()
+            return self._search_conversations_like(conn, query, limit)
+
+    def _search_conversations_like(self, conn, query: str,
+                                   limit: int) -> List[Tuple[int, str, datetime, str]]:
+        """Fallback substring search for builds without FTS5
+
+        A cheap title-prefix pass backed by the NOCASE title index runs
+        first; the full-table scan only runs when the prefix pass left
+        room under the limit. Message blobs are compressed, so a SQL LIKE
+        cannot see into them: the scan decodes each row's messages and
+        matches the substring in Python instead.
+        """
+        results = conn.execute("""
+            SELECT id, title, last_updated, summary
+            FROM conversations
+            WHERE title LIKE ? || '%' COLLATE NOCASE
+            ORDER BY last_updated DESC
+            LIMIT ?
+        """, (query, limit)).fetchall()
+        if len(results) >= limit:
+            return results
+
+        seen = {row['id'] for row in results}
+        needle = query.lower()
+        for row in conn.execute("""
+            SELECT id, title, last_updated, summary, messages
+            FROM conversations
+            ORDER BY last_updated DESC
+        """):
+            if row['id'] in seen:
+                continue
+            if (needle in (row['title'] or '').lower()
+                    or needle in (row['summary'] or '').lower()
+                    or needle in _messages_fts_text(row['messages']).lower()):
+                results.append(row)
+                if len(results) >= limit:
+                    break
+        return results
\ No newline at end of file
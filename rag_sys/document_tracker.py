@@ -1,73 +1,185 @@
-import json
 import logging
 import hashlib
+import mmap
 import os
+import time
+import orjson
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Set
 
 logger = logging.getLogger(__name__)
 
 class DocumentTracker:
     """Track processed documents to avoid reprocessing"""
-    
+
+    # Files at or above this size are hashed in fixed-size blocks so that
+    # append-mostly files (logs, scraped dumps) can reuse the digests of
+    # unchanged prefix blocks on re-hash instead of rereading everything
+    BLOCK_HASH_THRESHOLD = 16 * 1024 * 1024
+    BLOCK_SIZE = 4 * 1024 * 1024
+
     def __init__(self, cache_file: str = "document_cache.json"):
         self.cache_file = cache_file
         self.document_cache = self._load_cache()
+        self._defer_saves = False
+        self._dirty = False
 
     def _load_cache(self) -> Dict:
         """Load document cache from file"""
         if os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, 'r') as f:
-                    return json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    return orjson.loads(f.read())
             except Exception as e:
                 logger.error(f"Error loading cache file: {e}")
                 return {}
         return {}
 
     def _save_cache(self) -> None:
-        """Save document cache to file"""
+        """Save document cache to file (no-op inside a batch block)"""
+        if self._defer_saves:
+            return
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.document_cache, f, indent=2, default=str)
+            with open(self.cache_file, 'wb') as f:
+                f.write(orjson.dumps(self.document_cache, option=orjson.OPT_INDENT_2))
+            self._dirty = False
         except Exception as e:
             logger.error(f"Error saving cache file: {e}")
 
+    def flush(self) -> None:
+        """Write the cache to disk if it has unsaved changes"""
+        if self._dirty:
+            self._save_cache()
+
+    @contextmanager
+    def batch(self):
+        """Defer cache writes for a bulk operation, flushing once on exit
+
+        Without this, processing N documents rewrites the whole cache file
+        N times; inside a batch block it is written once.
+        """
+        self._defer_saves = True
+        try:
+            yield self
+        finally:
+            self._defer_saves = False
+            self.flush()
+
     def get_file_hash(self, file_path: str) -> str:
-        """Calculate file hash using SHA-256"""
+        """Calculate file hash using SHA-256, streaming so memory stays O(1)"""
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.sha256(f.read()).hexdigest()
+            file_hash, _ = self._compute_identity(
+                file_path, self.document_cache.get(file_path))
+            return file_hash
         except Exception as e:
             logger.error(f"Error calculating file hash: {e}")
             return ""
 
+    def _compute_identity(self, file_path: str, cached_info: Dict = None):
+        """Compute the (hash, block_hashes) identity of a file
+
+        Small files get a plain streamed SHA-256 and no block hashes. Large
+        files are hashed in BLOCK_SIZE blocks and their identity is the
+        SHA-256 over the concatenated block digests; when the file has only
+        grown since ``cached_info`` was recorded, the digests of full
+        blocks inside the old content are reused on the assumption that
+        existing bytes were not rewritten (append-mostly corpora).
+        """
+        size = os.path.getsize(file_path)
+        if size < self.BLOCK_HASH_THRESHOLD:
+            with open(file_path, 'rb', buffering=0) as f:
+                # Hash straight out of the page cache via mmap: no
+                # userspace copy and no Python read loop
+                if size:
+                    try:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            return hashlib.sha256(mm).hexdigest(), None
+                    except (ValueError, OSError):
+                        pass  # fall back to the buffered read below
+                return hashlib.file_digest(f, 'sha256').hexdigest(), None
+
+        cached_blocks = (cached_info or {}).get('block_hashes')
+        reusable = 0
+        if cached_blocks:
+            old_size = cached_info.get('size', 0)
+            # Strictly grown only: an unchanged size can still be an
+            # in-place edit, and reusing the cached digests there would
+            # just reproduce the old identity without reading the file
+            if size > old_size:
+                reusable = min(old_size // self.BLOCK_SIZE, len(cached_blocks))
+
+        blocks = list(cached_blocks[:reusable]) if reusable else []
+        with open(file_path, 'rb') as f:
+            f.seek(reusable * self.BLOCK_SIZE)
+            while data := f.read(self.BLOCK_SIZE):
+                blocks.append(hashlib.sha256(data).hexdigest())
+
+        return hashlib.sha256("".join(blocks).encode()).hexdigest(), blocks
+
     def is_document_processed(self, file_path: str) -> bool:
         """Check if document has been processed and hasn't changed"""
         if not os.path.exists(file_path):
             return False
 
-        current_hash = self.get_file_hash(file_path)
         file_info = self.document_cache.get(file_path, {})
-        
-        return (file_info.get('hash') == current_hash and 
-                file_info.get('chunk_ids') is not None)
+        if file_info.get('chunk_ids') is None:
+            return False
+
+        # Fast path: if size and mtime are unchanged, skip rehashing the file
+        stat = os.stat(file_path)
+        if (file_info.get('size') == stat.st_size and
+                file_info.get('mtime_ns') == stat.st_mtime_ns):
+            return True
+
+        # Fall back to the content hash (e.g. after a copy that reset mtime)
+        return file_info.get('hash') == self.get_file_hash(file_path)
 
     def add_document(self, file_path: str, chunk_ids: List[str]) -> None:
         """Add or update document in cache"""
-        self.document_cache[file_path] = {
-            'hash': self.get_file_hash(file_path),
-            'last_processed': datetime.now().isoformat(),
-            'chunk_ids': chunk_ids
+        stat = os.stat(file_path)
+        file_hash, block_hashes = self._compute_identity(
+            file_path, self.document_cache.get(file_path))
+        entry = {
+            'hash': file_hash,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'last_processed': time.time(),
+            'chunk_ids': chunk_ids,
+            'indexed': True
         }
+        if block_hashes is not None:
+            entry['block_hashes'] = block_hashes
+        self.document_cache[file_path] = entry
+        self._dirty = True
         self._save_cache()
 
+    @staticmethod
+    def processed_time(file_info: Dict) -> float:
+        """last_processed as a POSIX timestamp
+
+        Caches written before the switch to float timestamps stored ISO
+        strings; convert those on read so comparisons stay numeric.
+        """
+        value = file_info.get('last_processed', 0.0)
+        if isinstance(value, str):
+            return datetime.fromisoformat(value).timestamp()
+        return value
+
     def get_chunk_ids(self, file_path: str) -> List[str]:
         """Get chunk IDs for a processed document"""
         return self.document_cache.get(file_path, {}).get('chunk_ids', [])
 
+    def all_known_ids(self) -> Set[str]:
+        """Union of chunk IDs across every tracked document"""
+        known = set()
+        for file_info in self.document_cache.values():
+            known.update(file_info.get('chunk_ids', ()))
+        return known
+
     def remove_document(self, file_path: str) -> None:
         """Remove document from cache"""
         if file_path in self.document_cache:
             del self.document_cache[file_path]
+            self._dirty = True
             self._save_cache()
\ No newline at end of file
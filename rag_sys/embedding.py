@@ -1,33 +1,233 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import logging
-from typing import List
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 from tqdm import tqdm
 import chromadb
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+class EmbeddingCache:
+    """Persistent embedding cache keyed by SHA-256 of (model, task, text)
+
+    Vectors are stored as raw float32 blobs in SQLite, with a small
+    in-memory LRU layer on top for texts reused within a process (e.g.
+    repeated queries).
+    """
+
+    MEMORY_CACHE_SIZE = 1024
+    SELECT_BATCH = 500  # stay under SQLite's bound-parameter limit
+
+    def __init__(self, db_path: str = "embedding_cache.db"):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vec BLOB NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, task_type: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{task_type}\x00{text}".encode()).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.MEMORY_CACHE_SIZE:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors, memory layer first"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    found[key] = self._memory[key]
+                    self._memory.move_to_end(key)
+                else:
+                    missing.append(key)
+
+            for start in range(0, len(missing), self.SELECT_BATCH):
+                batch = missing[start:start + self.SELECT_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(
+                        f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})",
+                        batch):
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Store vectors in one transaction"""
+        if not items:
+            return
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes())
+                for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows)
+            self._conn.commit()
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+
 class GeminiEmbeddingFunction(chromadb.EmbeddingFunction):
-    """Enhanced embedding function with retry logic and error handling"""
-    
-    def __init__(self, api_key: str, document_mode: bool = True):
+    """Enhanced embedding function with batching, retry logic and error handling"""
+
+    MODEL_NAME = "models/text-embedding-004"
+    BATCH_SIZE = 100  # Gemini's per-request content cap
+    MAX_RETRIES = 3
+
+    def __init__(self, api_key: str, document_mode: bool = True,
+                 cache_path: Optional[str] = "embedding_cache.db"):
+        # Deferred so that importing rag_sys doesn't pay the genai/gRPC
+        # import cost; later imports are just sys.modules lookups
+        import google.generativeai as genai
+
         self.document_mode = document_mode
+        self.max_workers = int(os.getenv("RAG_EMBED_CONCURRENCY", "8"))
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
         genai.configure(api_key=api_key)
-        
-    def __call__(self, input: List[str]) -> List[List[float]]:
-        try:
-            embedding_task = "retrieval_document" if self.document_mode else "retrieval_query"
-            
-            embeddings = []
-            for text in tqdm(input, desc="Generating embeddings"):
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Rate-limit (429) and server (503) errors are worth retrying"""
+        message = str(error)
+        return "429" in message or "503" in message
+
+    def _embed_batch(self, batch: List[str], embedding_task: str) -> List[List[float]]:
+        """Embed a batch of texts with exponential-backoff retry"""
+        import google.generativeai as genai
+
+        for attempt in range(self.MAX_RETRIES):
+            try:
                 response = genai.embed_content(
-                    model="models/text-embedding-004",
-                    content=text,
+                    model=self.MODEL_NAME,
+                    content=batch,
                     task_type=embedding_task,
                 )
-                embeddings.append(response["embedding"])
-            
-            return embeddings
+                # With list content the API returns a list of embeddings
+                return response["embedding"]
+            except Exception as e:
+                if attempt + 1 == self.MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                wait = 2 ** attempt
+                logger.warning(f"Embedding batch failed ({e}), retrying in {wait}s")
+                time.sleep(wait)
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        try:
+            embedding_task = "retrieval_document" if self.document_mode else "retrieval_query"
+
+            if self.cache is None:
+                return self._embed_many(input, embedding_task)
+
+            keys = [EmbeddingCache.key(self.MODEL_NAME, embedding_task, text)
+                    for text in input]
+            cached = self.cache.get_many(keys)
+
+            miss_indices = [i for i, key in enumerate(keys) if key not in cached]
+            if miss_indices:
+                fresh = self._embed_many([input[i] for i in miss_indices], embedding_task)
+                self.cache.put_many({keys[i]: vector
+                                     for i, vector in zip(miss_indices, fresh)})
+                for i, vector in zip(miss_indices, fresh):
+                    cached[keys[i]] = vector
+
+            return [cached[key] for key in keys]
         except Exception as e:
             logger.error(f"Embedding generation failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def _embed_batch_async(self, batch: List[str], embedding_task: str,
+                                 semaphore: "asyncio.Semaphore") -> List[List[float]]:
+        """Async twin of _embed_batch, gated by the concurrency semaphore"""
+        import google.generativeai as genai
+
+        async with semaphore:
+            for attempt in range(self.MAX_RETRIES):
+                try:
+                    response = await genai.embed_content_async(
+                        model=self.MODEL_NAME,
+                        content=batch,
+                        task_type=embedding_task,
+                    )
+                    return response["embedding"]
+                except Exception as e:
+                    if attempt + 1 == self.MAX_RETRIES or not self._is_retryable(e):
+                        raise
+                    wait = 2 ** attempt
+                    logger.warning(f"Embedding batch failed ({e}), retrying in {wait}s")
+                    await asyncio.sleep(wait)
+
+    async def _embed_concurrently(self, batches: List[List[str]],
+                                  embedding_task: str, total: int) -> List[List[List[float]]]:
+        """Run all batches on one event loop, bounded by the semaphore"""
+        semaphore = asyncio.Semaphore(self.max_workers)
+        results: List[List[List[float]]] = [None] * len(batches)
+
+        with tqdm(total=total, desc="Generating embeddings") as progress:
+            async def run_one(idx: int) -> None:
+                results[idx] = await self._embed_batch_async(
+                    batches[idx], embedding_task, semaphore)
+                progress.update(len(batches[idx]))
+
+            await asyncio.gather(*(run_one(idx) for idx in range(len(batches))))
+        return results
+
+    def _embed_many(self, texts: List[str], embedding_task: str) -> List[List[float]]:
+        """Embed texts through the API, batched and dispatched concurrently"""
+        batches = [texts[start:start + self.BATCH_SIZE]
+                   for start in range(0, len(texts), self.BATCH_SIZE)]
+
+        # Single batch: no point paying any concurrency overhead
+        if len(batches) == 1:
+            return self._embed_batch(batches[0], embedding_task)
+
+        # The SDK exposes an async embed call, so overlapping the HTTPS
+        # round trips needs one event loop rather than a thread per request
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            results = asyncio.run(
+                self._embed_concurrently(batches, embedding_task, len(texts)))
+        else:
+            # Called from inside a running loop (e.g. an async host app):
+            # asyncio.run would fail, so fall back to worker threads
+            results = self._embed_with_threads(batches, embedding_task, len(texts))
+
+        embeddings = []
+        for batch_result in results:
+            embeddings.extend(batch_result)
+        return embeddings
+
+    def _embed_with_threads(self, batches: List[List[str]], embedding_task: str,
+                            total: int) -> List[List[List[float]]]:
+        """Thread-pool dispatch for contexts where an event loop is running"""
+        results: List[List[List[float]]] = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                tqdm(total=total, desc="Generating embeddings") as progress:
+            futures = {
+                executor.submit(self._embed_batch, batch, embedding_task): idx
+                for idx, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                results[idx] = future.result()
+                progress.update(len(batches[idx]))
+        return results
@@ -2,7 +2,9 @@ import cmd
 import os
 import signal
 import sys
+import threading
 import logging
+import orjson
 from typing import Optional, List
 from pathlib import Path
 from datetime import datetime
@@ -13,8 +15,6 @@ from rich.panel import Panel
 from rich import print as rprint
 from dotenv import load_dotenv
 
-
-from rag_sys.rag import RAGSystem, DocumentInfo
 from rag_sys.conversation import ConversationStore
 
 logger = logging.getLogger(__name__)
@@ -42,15 +42,24 @@ class InteractiveRAG(cmd.Cmd):
     """
     
     prompt = '\n[RAG]> '
-    
+
+    # Refresh the stored summary (an LLM round trip) every N turns only
+    SUMMARY_EVERY = 5
+
     def __init__(self, api_key: str, default_docs_path: Optional[str] = None):
+        # Deferred so that importing this module (e.g. for --help) doesn't
+        # pull in chromadb and the rest of the RAG stack
+        from rag_sys.rag import RAGSystem
+
         super().__init__()
         self.console = Console()
         self.rag = RAGSystem(api_key=api_key)
         self.conversation_store = ConversationStore()
         self.current_conversation_id = None
         self.conversation_history = []
+        self._serialized_history = bytearray()
         self.last_query = None
+        self._turns_since_summary = 0
         
         # Setup signal handler for clean exit
         signal.signal(signal.SIGINT, self.handle_sigint)
@@ -69,11 +78,18 @@ class InteractiveRAG(cmd.Cmd):
             if not cached_docs:
                 return
 
+            # The 'indexed' flag is set once a document reaches the vector
+            # store, so startup needs no per-file hashing or stat calls;
+            # content changes are still caught lazily by process/ask.
+            # Entries from caches written before the flag existed were
+            # only ever recorded after a successful add, so having chunk
+            # IDs is treated as indexed for them.
             docs_to_process = []
-            for doc_path in cached_docs.keys():
-                if os.path.exists(doc_path) and not self.rag.document_tracker.is_document_processed(doc_path):
+            for doc_path, info in cached_docs.items():
+                indexed = info.get('indexed', 'chunk_ids' in info)
+                if not indexed and os.path.exists(doc_path):
                     docs_to_process.append(doc_path)
-                    
+
             if docs_to_process:
                 self.console.print("[yellow]Знайдено непроіндексовані документи у кеші. Починаю обробку...[/yellow]")
                 for doc_path in docs_to_process:
@@ -211,6 +227,8 @@ class InteractiveRAG(cmd.Cmd):
 
     def do_stats(self, arg):
         """Show system statistics"""
+        from rag_sys.rag import DocumentInfo
+
         try:
             # First, ensure all document info is loaded from cache
             cached_docs = self.rag.document_tracker.document_cache
@@ -218,14 +236,17 @@ class InteractiveRAG(cmd.Cmd):
                 if doc_path not in self.rag.document_info and os.path.exists(doc_path):
                     try:
                         file_type = Path(doc_path).suffix.lower()
-                        self.rag.document_info[doc_path] = DocumentInfo(
+                        # Registered through the RAG system so its running
+                        # stat aggregates stay consistent
+                        self.rag.register_document_info(DocumentInfo(
                             file_path=doc_path,
                             file_type=file_type,
                             size=os.path.getsize(doc_path),
-                            processed_date=datetime.fromisoformat(info['last_processed']),
+                            processed_date=datetime.fromtimestamp(
+                                self.rag.document_tracker.processed_time(info)),
                             chunks=len(info['chunk_ids']),
                             embedding_model="models/text-embedding-004"
-                        )
+                        ))
                     except Exception as e:
                         logger.error(f"Error loading document info for {doc_path}: {e}")
             
@@ -274,42 +295,83 @@ class InteractiveRAG(cmd.Cmd):
         except Exception as e:
             self.console.print(f"[red]Error processing directory: {e}[/red]")
 
+    def _append_history(self, role: str, content: str):
+        """Add a message to the history and its serialized mirror"""
+        message = {"role": role, "content": content}
+        self.conversation_history.append(message)
+        self._serialized_history += orjson.dumps(message) + b","
+
+    def _reset_history(self, messages: Optional[List[dict]] = None):
+        """Replace the history, rebuilding the serialized mirror"""
+        self.conversation_history = messages if messages is not None else []
+        self._serialized_history = bytearray()
+        for message in self.conversation_history:
+            self._serialized_history += orjson.dumps(message) + b","
+
+    def _history_payload(self) -> str:
+        """The full history as a JSON string, built from the append-only
+        buffer so the cost per turn is O(new message), not O(history)"""
+        if not self._serialized_history:
+            return "[]"
+        return (b"[" + bytes(self._serialized_history[:-1]) + b"]").decode('utf-8')
+
     def _ensure_conversation(self):
         """Ensure there's an active conversation"""
         if self.current_conversation_id is None:
             title = f"Conversation {datetime.now().strftime('%Y-%m-%d %H:%M')}"
             self.current_conversation_id = self.conversation_store.create_conversation(title)
-            self.conversation_history = []
+            self._reset_history()
 
     def _update_current_conversation(self):
-        """Update the current conversation in storage"""
-        if self.current_conversation_id:
-            summary = ""
-            if self.conversation_history:
-                try:
-                    # Generate summary without retrieval
-                    summary = self.rag.generate_response(
-                        query="",  # Not used when retrieval_enabled=False
-                        language="Ukrainian",
-                        model_name="gemini-1.5-flash-latest",
-                        context_history=self.conversation_history,
-                        retrieval_enabled=False  # Skip vector search for summary
-                    )
-                except Exception as e:
-                    logger.error(f"Error generating summary: {e}")
-                    summary = "No summary available"
-
-            self.conversation_store.update_conversation(
-                self.current_conversation_id,
-                self.conversation_history,
-                summary
+        """Update the current conversation in storage
+
+        Messages are persisted on every call; the summary is an LLM round
+        trip, so it is only refreshed every SUMMARY_EVERY turns and runs in
+        a background thread to keep the prompt responsive.
+        """
+        if not self.current_conversation_id:
+            return
+
+        # Cheap path: persist messages, keep the existing summary
+        self.conversation_store.update_conversation(
+            self.current_conversation_id,
+            self._history_payload(),
+            None
+        )
+
+        self._turns_since_summary += 1
+        if self.conversation_history and self._turns_since_summary >= self.SUMMARY_EVERY:
+            self._turns_since_summary = 0
+            threading.Thread(
+                target=self._refresh_summary,
+                args=(self.current_conversation_id, list(self.conversation_history)),
+                daemon=True
+            ).start()
+
+    def _refresh_summary(self, conv_id: int, history: List[dict]):
+        """Regenerate and store the conversation summary"""
+        try:
+            # Generate summary without retrieval
+            summary = self.rag.generate_response(
+                query="",  # Not used when retrieval_enabled=False
+                language="Ukrainian",
+                model_name="gemini-1.5-flash-latest",
+                context_history=history,
+                retrieval_enabled=False  # Skip vector search for summary
             )
+        except Exception as e:
+            logger.error(f"Error generating summary: {e}")
+            return
+
+        # Summary only: turns persisted while the LLM call was in flight
+        # must not be overwritten with this thread's older snapshot
+        self.conversation_store.update_summary(conv_id, summary)
 
     def do_new(self, arg):
         """Start a new conversation: new [title]"""
         title = arg if arg else f"Conversation {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         self.current_conversation_id = self.conversation_store.create_conversation(title)
-        self.conversation_history = []
+        self._reset_history()
         self.console.print(f"[green]Started new conversation: {title}[/green]")
 
     def do_list(self, arg):
@@ -350,7 +412,7 @@ class InteractiveRAG(cmd.Cmd):
             
             if conversation:
                 self.current_conversation_id = conversation.id
-                self.conversation_history = conversation.messages
+                self._reset_history(conversation.messages)
                 self.console.print(f"[green]Loaded conversation: {conversation.title}[/green]")
                 self.do_history("")
             else:
@@ -399,7 +461,7 @@ class InteractiveRAG(cmd.Cmd):
             
             # Store query in history
             self.last_query = arg
-            self.conversation_history.append({"role": "user", "content": arg})
+            self._append_history("user", arg)
             
             # Generate response
             response = self.rag.generate_response(
@@ -409,7 +471,7 @@ class InteractiveRAG(cmd.Cmd):
             )
             
             # Store response in history
-            self.conversation_history.append({"role": "assistant", "content": response})
+            self._append_history("assistant", response)
             
             # Update conversation in database
             self._update_current_conversation()
@@ -463,7 +525,7 @@ class InteractiveRAG(cmd.Cmd):
 
     def do_clear_history(self, arg):
         """Clear conversation history"""
-        self.conversation_history = []
+        self._reset_history()
         self.console.print("[yellow]Conversation history cleared[/yellow]")
 
     def do_remove(self, arg):
@@ -1,20 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional, Set
+import os
+from typing import Callable, Iterator, List, Dict, Optional, Set
 from datetime import datetime
-import google.generativeai as genai
 import logging
 import chromadb
+import numpy as np
 
 from rag_sys.text_chunker import TextChunker
 from rag_sys.embedding import GeminiEmbeddingFunction
 from rag_sys.document_parser import DocumentParser
 from rag_sys.document_tracker import DocumentTracker
+from rag_sys.prompts import SUMMARY_PROMPT, FULL_RESPONSE_PROMPT
 
-import pandas as pd
+from collections import Counter
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Built once at import instead of per processed file
+_PARSER_METHODS: Dict[str, Callable[[str], str]] = {
+    '.pdf': DocumentParser.read_pdf,
+    '.docx': DocumentParser.read_docx,
+    '.txt': DocumentParser.read_txt,
+    '.html': DocumentParser.read_html
+}
+
+_DEFAULT_FILE_TYPES = tuple(_PARSER_METHODS)
+
+
+def _iter_files(root: str, extensions: tuple) -> Iterator[str]:
+    """Yield matching file paths under root, recursively
+
+    Walks with os.scandir and matches extensions via str.endswith on the
+    lowercased name, avoiding a Path object and suffix property per entry;
+    on large trees the walk itself dominates before any parsing starts.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(extensions):
+                        yield entry.path
+        except OSError as e:
+            # An unreadable subdirectory shouldn't abort the whole walk
+            logger.warning(f"Skipping unreadable directory {directory}: {e}")
+
 
 @dataclass
 class DocumentInfo:
@@ -28,35 +63,68 @@ class DocumentInfo:
 
 class RAGSystem:
     """Main RAG system class with document tracking and generation capabilities"""
-    
-    def __init__(self, api_key: str, db_name: str = "documentdb"):
+
+    # Upper bound per ChromaDB add call; the embedding function batches
+    # its API requests internally below this
+    ADD_BATCH_SIZE = 256
+
+    # Parse files in worker threads once a directory has more than
+    # PARALLEL_THRESHOLD of them; below that the pool isn't worth spinning up
+    PREPARE_WORKERS = 8
+    PARALLEL_THRESHOLD = 4
+
+    # Page size for walking collection metadata in get_document_sources
+    SOURCES_PAGE_SIZE = 1000
+
+    # ANN candidates pulled from Chroma for exact cosine reranking in query
+    RERANK_CANDIDATES = 50
+
+    def __init__(self, api_key: str, db_name: str = "documentdb",
+                 backend: str = "chroma", embedding_function=None):
         self.api_key = api_key
         self.db_name = db_name
-        self.embed_fn = GeminiEmbeddingFunction(api_key)
+        # Injectable mainly for tests: the same function must embed both
+        # stored documents and queries, or their dimensions drift apart
+        self.embed_fn = (embedding_function if embedding_function is not None
+                         else GeminiEmbeddingFunction(api_key))
         self.chunker = TextChunker()
         self.document_info: Dict[str, DocumentInfo] = {}
+        # Running aggregates kept in sync by register_document_info /
+        # remove_document so get_system_stats never rescans the dict
+        self._total_chunks = 0
+        self._type_counts = Counter()
         self.document_tracker = DocumentTracker()
-        
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient()
-        self.db = self.chroma_client.get_or_create_collection(
-            name=db_name,
-            embedding_function=self.embed_fn
-        )
-        
-        logger.info(f"RAG System initialized with database: {db_name}")
+
+        # Initialize the vector store; both backends expose the same
+        # collection-style add/query/get/delete surface
+        if backend == "chroma":
+            self.chroma_client = chromadb.PersistentClient()
+            self.db = self.chroma_client.get_or_create_collection(
+                name=db_name,
+                embedding_function=self.embed_fn
+            )
+        elif backend == "sqlite-vec":
+            from rag_sys.vector_store import SqliteVecStore
+            self.db = SqliteVecStore(db_name, self.embed_fn)
+        else:
+            raise ValueError(f"Unknown vector store backend: {backend}")
+
+        logger.info(f"RAG System initialized with database: {db_name} ({backend})")
 
     def process_directory(self, directory_path: str, file_types: Optional[List[str]] = None) -> None:
         """Process all supported documents in a directory"""
-        if file_types is None:
-            file_types = ['.pdf', '.docx', '.txt', '.html']
-            
-        directory = Path(directory_path)
+        extensions = (_DEFAULT_FILE_TYPES if file_types is None
+                      else tuple(file_types))
         processed_files = set()
-        
-        for file_path in directory.rglob('*'):
-            if file_path.suffix.lower() in file_types:
-                str_path = str(file_path)
+
+        # Snapshot the tracker's view before this run updates it; anything
+        # known then but not reprocessed now is stale
+        known_ids = self.document_tracker.all_known_ids()
+
+        # Defer tracker cache writes so the bulk run saves the file once
+        with self.document_tracker.batch():
+            to_prepare = []
+            for str_path in _iter_files(directory_path, extensions):
                 try:
                     # Skip if already processed and unchanged
                     if self.document_tracker.is_document_processed(str_path):
@@ -64,76 +132,155 @@ class RAGSystem:
                         chunk_ids = self.document_tracker.get_chunk_ids(str_path)
                         processed_files.update(chunk_ids)
                         continue
-                        
-                    # Process new or modified file
-                    chunk_ids = self.process_file(str_path)
-                    processed_files.update(chunk_ids)
-                    
+                    to_prepare.append(str_path)
                 except Exception as e:
                     logger.error(f"Failed to process {str_path}: {e}")
 
+            # Parse and chunk the new files; the database write is
+            # batched across all of them below
+            prepared_files = self._prepare_files(to_prepare)
+            for _, prepared in prepared_files:
+                processed_files.update(prepared[3])
+
+            if prepared_files:
+                try:
+                    all_chunks, all_ids, all_metadatas = [], [], []
+                    for _, (_, _, chunks, chunk_ids, metadatas) in prepared_files:
+                        all_chunks.extend(chunks)
+                        all_ids.extend(chunk_ids)
+                        all_metadatas.extend(metadatas)
+
+                    # One batched add: the embedding function sees the whole
+                    # chunk list instead of one small request per file
+                    self._add_chunks(all_chunks, all_ids, all_metadatas)
+
+                    for str_path, (file_type, text_length, chunks, chunk_ids, _) in prepared_files:
+                        self._record_document(str_path, file_type, text_length, chunk_ids)
+                except Exception as e:
+                    logger.error(f"Failed to add prepared chunks: {e}")
+
         # Clean up old chunks that no longer exist
-        self._cleanup_old_chunks(processed_files)
+        self._cleanup_old_chunks(known_ids - processed_files)
+
+    def _prepare_files(self, file_paths: List[str]):
+        """Parse and chunk files, in parallel when there are enough of them
+
+        _prepare_file is pure parsing and chunking with no shared mutable
+        state, so it is safe in worker threads; database writes and tracker
+        updates stay on the caller's thread. Per-file failures are logged
+        and skipped, matching the serial behavior.
+        """
+        def prepare_one(path: str):
+            try:
+                return path, self._prepare_file(path)
+            except Exception as e:
+                logger.error(f"Failed to process {path}: {e}")
+                return path, None
+
+        if len(file_paths) > self.PARALLEL_THRESHOLD:
+            with ThreadPoolExecutor(max_workers=self.PREPARE_WORKERS) as executor:
+                results = list(executor.map(prepare_one, file_paths))
+        else:
+            results = [prepare_one(path) for path in file_paths]
+
+        return [(path, prepared) for path, prepared in results if prepared is not None]
+
+    def _prepare_file(self, file_path: str):
+        """Parse and chunk a file without touching the database
+
+        Returns a (file_type, text_length, chunks, chunk_ids, metadatas)
+        tuple, or None for unsupported file types.
+        """
+        # One Path construction serves both the suffix and the stem
+        path = Path(file_path)
+        file_type = path.suffix.lower()
+
+        parser = _PARSER_METHODS.get(file_type)
+        if parser is None:
+            logger.warning(f"Unsupported file type: {file_type}")
+            return None
+
+        text = parser(file_path)
+        chunks = self.chunker.chunk_text(text)
+
+        # Generate chunk IDs and metadata in a single pass over the chunks
+        stem = path.stem
+        chunk_ids = []
+        metadatas = []
+        for i in range(len(chunks)):
+            chunk_ids.append(f"{stem}_chunk_{i}")
+            metadatas.append({"source": file_path, "chunk_index": i})
+
+        return file_type, len(text), chunks, chunk_ids, metadatas
+
+    def _add_chunks(self, chunks: List[str], chunk_ids: List[str], metadatas: List[Dict]) -> None:
+        """Add chunks to the vector store in bounded batches
+
+        upsert rather than add, so reprocessing a modified file overwrites
+        its chunks in place instead of needing a delete round trip first.
+        """
+        for start in range(0, len(chunk_ids), self.ADD_BATCH_SIZE):
+            end = start + self.ADD_BATCH_SIZE
+            self.db.upsert(
+                documents=chunks[start:end],
+                ids=chunk_ids[start:end],
+                metadatas=metadatas[start:end]
+            )
+
+    def register_document_info(self, info: DocumentInfo) -> None:
+        """Insert or replace a document's info, keeping running stats in sync"""
+        previous = self.document_info.get(info.file_path)
+        if previous is not None:
+            self._total_chunks -= previous.chunks
+            self._type_counts[previous.file_type] -= 1
+            if not self._type_counts[previous.file_type]:
+                del self._type_counts[previous.file_type]
+        self.document_info[info.file_path] = info
+        self._total_chunks += info.chunks
+        self._type_counts[info.file_type] += 1
+
+    def _record_document(self, file_path: str, file_type: str, text_length: int,
+                         chunk_ids: List[str]) -> None:
+        """Store document info and update the tracker after a successful add"""
+        self.register_document_info(DocumentInfo(
+            file_path=file_path,
+            file_type=file_type,
+            size=text_length,
+            processed_date=datetime.now(),
+            chunks=len(chunk_ids),
+            embedding_model="models/text-embedding-004"
+        ))
+        self.document_tracker.add_document(file_path, chunk_ids)
+        logger.info(f"Successfully processed {file_path}: {len(chunk_ids)} chunks created")
 
     def process_file(self, file_path: str) -> List[str]:
         """Process a single file and return chunk IDs"""
-        file_type = Path(file_path).suffix.lower()
-        
-        parser_methods = {
-            '.pdf': DocumentParser.read_pdf,
-            '.docx': DocumentParser.read_docx,
-            '.txt': DocumentParser.read_txt,
-            '.html': DocumentParser.read_html
-        }
-        
-        if file_type not in parser_methods:
-            logger.warning(f"Unsupported file type: {file_type}")
-            return []
-            
         try:
-            text = parser_methods[file_type](file_path)
-            chunks = self.chunker.chunk_text(text)
-            
-            # Generate unique IDs for chunks
-            chunk_ids = [f"{Path(file_path).stem}_chunk_{i}" for i in range(len(chunks))]
-            
-            # Add to ChromaDB
-            self.db.add(
-                documents=chunks,
-                ids=chunk_ids,
-                metadatas=[{"source": file_path, "chunk_index": i} for i in range(len(chunks))]
-            )
-            
-            # Store document info
-            self.document_info[file_path] = DocumentInfo(
-                file_path=file_path,
-                file_type=file_type,
-                size=len(text),
-                processed_date=datetime.now(),
-                chunks=len(chunks),
-                embedding_model="models/text-embedding-004"
-            )
-            
-            # Update document tracker
-            self.document_tracker.add_document(file_path, chunk_ids)
-            
-            logger.info(f"Successfully processed {file_path}: {len(chunks)} chunks created")
-            
+            prepared = self._prepare_file(file_path)
+            if prepared is None:
+                return []
+
+            file_type, text_length, chunks, chunk_ids, metadatas = prepared
+            self._add_chunks(chunks, chunk_ids, metadatas)
+            self._record_document(file_path, file_type, text_length, chunk_ids)
+
             return chunk_ids
-            
+
         except Exception as e:
             logger.error(f"Error processing {file_path}: {e}")
             raise
 
-    def _cleanup_old_chunks(self, current_chunk_ids: Set[str]) -> None:
-        """Remove chunks that no longer exist in the current document set"""
+    def _cleanup_old_chunks(self, stale_chunk_ids: Set[str]) -> None:
+        """Remove chunks that no longer belong to any current document
+
+        The caller derives the stale set from the tracker, so cleanup
+        scales with the number of changed documents instead of fetching
+        every stored ID from the database.
+        """
         try:
-            existing_chunks = set(self.db.get(include=['documents'])['ids'])
-            chunks_to_remove = existing_chunks - current_chunk_ids
-            
-            if chunks_to_remove:
-                self.db.delete(ids=list(chunks_to_remove))
-                logger.info(f"Removed {len(chunks_to_remove)} obsolete chunks")
+            if stale_chunk_ids:
+                self.db.delete(ids=list(stale_chunk_ids))
+                logger.info(f"Removed {len(stale_chunk_ids)} obsolete chunks")
         except Exception as e:
             logger.error(f"Error during chunk cleanup: {e}")
 
@@ -144,41 +291,80 @@ class RAGSystem:
             if chunk_ids:
                 self.db.delete(ids=chunk_ids)
             self.document_tracker.remove_document(file_path)
-            if file_path in self.document_info:
-                del self.document_info[file_path]
+            info = self.document_info.pop(file_path, None)
+            if info is not None:
+                self._total_chunks -= info.chunks
+                self._type_counts[info.file_type] -= 1
+                if not self._type_counts[info.file_type]:
+                    del self._type_counts[info.file_type]
             logger.info(f"Successfully removed document: {file_path}")
         except Exception as e:
             logger.error(f"Error removing document {file_path}: {e}")
 
     def query(self, query_text: str, n_results: int = 3) -> Dict:
-        """Query the document database"""
+        """Query the document database
+
+        Chroma's HNSW index returns approximate neighbors; a wider
+        candidate set is pulled with its embeddings and reranked here by
+        exact cosine similarity, so the final top-k ordering does not
+        depend on ANN approximation error.
+        """
         try:
             # Switch to query mode for embedding
             self.embed_fn.document_mode = False
-            
-            # Search the database
+
+            # Embed the query once ourselves (the embedding cache makes
+            # repeats free) and hand Chroma the vector directly
+            query_vec = self.embed_fn([query_text])[0]
+
             results = self.db.query(
-                query_texts=[query_text],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
+                query_embeddings=[query_vec],
+                n_results=max(self.RERANK_CANDIDATES, n_results),
+                include=["embeddings", "documents", "metadatas", "distances"]
             )
-            
+
+            documents = results["documents"][0]
+            metadatas = results["metadatas"][0]
+            distances = results["distances"][0]
+            embeddings = results.get("embeddings")
+
+            # Empty collection: nothing to rank (and the matmul below
+            # would choke on a zero-length candidate matrix)
+            if not documents:
+                return {"query": query_text, "results": []}
+
+            if embeddings is not None and len(embeddings[0]) == len(documents):
+                # Exact rerank: one vectorized matmul over the candidates,
+                # then an argpartition for top-k instead of a full sort
+                candidate_vecs = np.asarray(embeddings[0], dtype=np.float32)
+                query_arr = np.asarray(query_vec, dtype=np.float32)
+                scores = candidate_vecs @ query_arr / (
+                    np.linalg.norm(candidate_vecs, axis=1)
+                    * np.linalg.norm(query_arr))
+                if len(scores) > n_results:
+                    top = np.argpartition(-scores, n_results)[:n_results]
+                else:
+                    top = np.arange(len(scores))
+                top = top[np.argsort(-scores[top])]
+                ranked = [(documents[i], metadatas[i], float(scores[i]))
+                          for i in top]
+            else:
+                # Embeddings unavailable: keep Chroma's ANN order and its
+                # distance-derived similarity, converted in one array op
+                similarities = 1.0 - np.asarray(distances[:n_results],
+                                                dtype=np.float32)
+                ranked = [(doc, meta, float(similarity))
+                          for doc, meta, similarity
+                          in zip(documents, metadatas, similarities)]
+
             return {
                 "query": query_text,
                 "results": [
-                    {
-                        "text": doc,
-                        "metadata": meta,
-                        "similarity": 1 - dist  # Convert distance to similarity
-                    }
-                    for doc, meta, dist in zip(
-                        results["documents"][0],
-                        results["metadatas"][0],
-                        results["distances"][0]
-                    )
+                    {"text": doc, "metadata": meta, "similarity": similarity}
+                    for doc, meta, similarity in ranked
                 ]
             }
-            
+
         except Exception as e:
             logger.error(f"Query failed: {e}")
             raise
@@ -188,6 +374,10 @@ class RAGSystem:
                          context_history: Optional[List[Dict]] = None,
                          retrieval_enabled: bool = True) -> str:
         """Generate a response using retrieved documents and conversation history"""
+        # Deferred like in the embedding function: callers that only
+        # ingest documents never pay the genai/gRPC import cost
+        import google.generativeai as genai
+
         try:
             context_parts = []
             
@@ -201,39 +391,30 @@ class RAGSystem:
             
             reference_context = "\n\n".join(context_parts)
             
-            # Create conversation context
+            # Create conversation context: pair user/assistant turns with
+            # zip (which stops at a trailing unanswered message) and join
+            # once, without an intermediate list or index arithmetic
             conversation_context = ""
             if context_history:
-                conversation_pairs = []
-                for i in range(0, len(context_history)-1, 2):
-                    user_msg = context_history[i]["content"]
-                    assistant_msg = context_history[i+1]["content"]
-                    conversation_pairs.append(
-                        f"User: {user_msg}\nAssistant: {assistant_msg}"
-                    )
-                conversation_context = "\n\n".join(conversation_pairs)
+                conversation_context = "\n\n".join(
+                    f"User: {user['content']}\nAssistant: {assistant['content']}"
+                    for user, assistant in zip(context_history[0::2],
+                                               context_history[1::2])
+                )
             
             # Adjust prompt based on whether this is a summary or full response
             if not retrieval_enabled:
-                prompt = f"""Based on the conversation history below, provide a brief 1-2 sentence summary.
-                Answer in the specified language: {language}
-                
-                Conversation:
-                {conversation_context}
-                """
+                prompt = SUMMARY_PROMPT.format(
+                    language=language,
+                    conversation_context=conversation_context,
+                )
             else:
-                prompt = f"""You are a helpful and informative bot that answers questions using the reference passages and conversation history included below.
-                Be sure to respond in a complete sentence, being comprehensive, including all relevant background information.
-                If the passages are irrelevant to the answer, you may ignore them. Answer in the specified language: {language}
-                
-                Previous Conversation:
-                {conversation_context}
-                
-                Reference Passages:
-                {reference_context}
-                
-                Current Question: {query}
-                """
+                prompt = FULL_RESPONSE_PROMPT.format(
+                    language=language,
+                    conversation_context=conversation_context,
+                    reference_context=reference_context,
+                    query=query,
+                )
             
             # Generate response
             model = genai.GenerativeModel(model_name)
@@ -248,18 +429,21 @@ class RAGSystem:
         """Get system statistics"""
         stats = {
             "total_documents": len(self.document_info),
-            "total_chunks": sum(doc.chunks for doc in self.document_info.values()),
-            "document_types": dict(pd.Series([doc.file_type for doc in self.document_info.values()]).value_counts()),
-            "average_chunks_per_doc": sum(doc.chunks for doc in self.document_info.values()) / len(self.document_info) if self.document_info else 0,
+            "total_chunks": self._total_chunks,
+            "document_types": dict(self._type_counts),
+            "average_chunks_per_doc": self._total_chunks / len(self.document_info) if self.document_info else 0,
             "processed_documents": list(self.document_info.keys())
         }
         
-        # Add document tracking stats
+        # Add document tracking stats; timestamps are compared numerically
+        # and formatted only for the final report
+        last_ts = max((self.document_tracker.processed_time(info)
+                       for info in self.document_tracker.document_cache.values()),
+                      default=0.0)
         stats.update({
             "cached_documents": len(self.document_tracker.document_cache),
-            "last_processed": max([info.get('last_processed', '1970-01-01') 
-                                 for info in self.document_tracker.document_cache.values()],
-                                default='No documents processed')
+            "last_processed": (datetime.fromtimestamp(last_ts).isoformat()
+                               if last_ts else 'No documents processed')
         })
         
         return stats
@@ -267,13 +451,24 @@ class RAGSystem:
     def get_document_sources(self) -> Dict[str, List[str]]:
         """Get a mapping of which documents contributed to which chunks"""
         try:
-            all_metadatas = self.db.get(include=['metadatas'])['metadatas']
             sources = {}
-            for metadata in all_metadatas:
-                source = metadata['source']
-                if source not in sources:
-                    sources[source] = []
-                sources[source].append(f"Chunk {metadata['chunk_index']}")
+            # Page through the collection instead of materializing every
+            # metadata dict at once; large collections stay bounded
+            offset = 0
+            while True:
+                batch = self.db.get(include=['metadatas'],
+                                    limit=self.SOURCES_PAGE_SIZE, offset=offset)
+                metadatas = batch['metadatas']
+                if not metadatas:
+                    break
+                for metadata in metadatas:
+                    source = metadata['source']
+                    if source not in sources:
+                        sources[source] = []
+                    sources[source].append(f"Chunk {metadata['chunk_index']}")
+                if len(metadatas) < self.SOURCES_PAGE_SIZE:
+                    break
+                offset += self.SOURCES_PAGE_SIZE
             return sources
         except Exception as e:
             logger.error(f"Error getting document sources: {e}")
@@ -24,40 +24,28 @@ class TextChunker:
             chunker = TextChunker(chunk_size=100, overlap=20)
             chunks = chunker.chunk_text("long text here...")
         """
-        chunks = []
         if not text:
-            return chunks
+            return []
+
+        # Texts that fit in one chunk skip the offset computation entirely
+        if len(text) <= self.chunk_size:
+            return [text] if text.strip() else []
 
         # Ensure overlap is smaller than chunk_size
         if self.overlap >= self.chunk_size:
             self.overlap = self.chunk_size // 2
             logger.warning(f"Overlap was too large, adjusted to {self.overlap}")
 
-        start = 0
+        chunk_size = self.chunk_size
+        step = chunk_size - self.overlap
         text_length = len(text)
 
-        while start < text_length:
-            # Calculate end position for current chunk
-            end = min(start + self.chunk_size, text_length)
-            
-            # Extract chunk
-            chunk = text[start:end]
-            
-            # Only add non-empty chunks
-            if chunk.strip():
-                chunks.append(chunk)
-            
-            # Calculate next start position
-            # If this is the last chunk, break
-            if end == text_length:
-                break
-                
-            # Move start position forward by chunk_size - overlap
-            start += (self.chunk_size - self.overlap)
-            
-            # Safety check: ensure we're making progress
-            if start >= end:
-                logger.warning("Chunking progress stalled, breaking loop")
-                break
+        # Precompute the chunk start offsets instead of advancing a cursor
+        # through a Python-level while loop: generation is a single slicing
+        # comprehension and the per-iteration branching disappears. A chunk
+        # starts at every step until the previous chunk reached the end.
+        starts = range(0, max(text_length - self.overlap, 1), step)
+        chunks = [text[start:start + chunk_size] for start in starts]
 
-        return chunks
\ No newline at end of file
+        # Only keep non-empty chunks
+        return [chunk for chunk in chunks if chunk.strip()]
\ No newline at end of file
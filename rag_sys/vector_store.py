@@ -0,0 +1,171 @@
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore(Protocol):
+    """Collection-like surface shared by the vector store backends
+
+    Mirrors the subset of the Chroma collection API that RAGSystem uses,
+    so a Chroma collection satisfies it directly and alternative backends
+    only need to speak the same shapes.
+    """
+
+    def add(self, documents: List[str], ids: List[str],
+            metadatas: List[Dict]) -> None: ...
+
+    def query(self, query_embeddings: List[List[float]], n_results: int,
+              include: List[str]) -> Dict: ...
+
+    def get(self, include: List[str], limit: Optional[int] = None,
+            offset: int = 0) -> Dict: ...
+
+    def delete(self, ids: List[str]) -> None: ...
+
+
+class SqliteVecStore:
+    """Single-file vector store backed by the sqlite-vec extension
+
+    For corpora in the tens of thousands of chunks a brute-force scan in
+    SQLite answers queries in milliseconds, without Chroma's HNSW index,
+    metadata tables and client machinery. Results come back in the same
+    nested-list shapes a Chroma collection returns.
+    """
+
+    # Output dimensionality of models/text-embedding-004
+    EMBEDDING_DIM = 768
+
+    def __init__(self, name: str, embedding_function):
+        import sqlite_vec
+
+        self.embedding_function = embedding_function
+        self._conn = sqlite3.connect(f"{name}.sqlite-vec.db",
+                                     check_same_thread=False)
+        if not hasattr(self._conn, "enable_load_extension"):
+            raise RuntimeError(
+                "This Python build lacks SQLite loadable-extension support, "
+                "which sqlite-vec requires; use the chroma backend instead")
+        self._conn.enable_load_extension(True)
+        sqlite_vec.load(self._conn)
+        self._conn.enable_load_extension(False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+        """)
+        self._conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS vec_chunks USING vec0(
+                embedding FLOAT[{self.EMBEDDING_DIM}]
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _serialize(vector) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    def add(self, documents: List[str], ids: List[str],
+            metadatas: List[Dict]) -> None:
+        """Embed and store chunks; existing IDs are replaced"""
+        embeddings = self.embedding_function(documents)
+        # Re-adding an id replaces the old row, so stale vectors for
+        # re-chunked documents are cleared as part of the same write
+        self.delete(ids)
+        with self._conn:  # one transaction amortizes the fsync
+            for chunk_id, document, metadata, embedding in zip(
+                    ids, documents, metadatas, embeddings):
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, document, metadata) "
+                    "VALUES (?, ?, ?)",
+                    (chunk_id, document, orjson.dumps(metadata).decode()))
+                self._conn.execute(
+                    "INSERT INTO vec_chunks (rowid, embedding) VALUES (?, ?)",
+                    (cursor.lastrowid, self._serialize(embedding)))
+
+    # Chroma's name for the same replace-on-conflict semantics
+    upsert = add
+
+    def query(self, query_embeddings: Optional[List[List[float]]] = None,
+              query_texts: Optional[List[str]] = None, n_results: int = 10,
+              include: Optional[List[str]] = None) -> Dict:
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        include = include or ["documents", "metadatas", "distances"]
+
+        ids, documents, metadatas, distances, embeddings = [], [], [], [], []
+        for query_vec in query_embeddings:
+            rows = self._conn.execute(
+                """
+                SELECT chunks.chunk_id, chunks.document, chunks.metadata,
+                       vec_chunks.distance, vec_chunks.embedding
+                FROM vec_chunks
+                JOIN chunks ON chunks.rowid = vec_chunks.rowid
+                WHERE vec_chunks.embedding MATCH ? AND k = ?
+                ORDER BY vec_chunks.distance
+                """,
+                (self._serialize(query_vec), n_results)).fetchall()
+            ids.append([row[0] for row in rows])
+            documents.append([row[1] for row in rows])
+            metadatas.append([orjson.loads(row[2]) for row in rows])
+            distances.append([row[3] for row in rows])
+            embeddings.append([
+                np.frombuffer(row[4], dtype=np.float32).tolist()
+                for row in rows])
+
+        results = {"ids": ids}
+        if "documents" in include:
+            results["documents"] = documents
+        if "metadatas" in include:
+            results["metadatas"] = metadatas
+        if "distances" in include:
+            results["distances"] = distances
+        if "embeddings" in include:
+            results["embeddings"] = embeddings
+        return results
+
+    def get(self, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: int = 0) -> Dict:
+        include = include if include is not None else ["documents", "metadatas"]
+        sql = "SELECT chunk_id, document, metadata FROM chunks ORDER BY rowid"
+        params = []
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = [limit, offset]
+        rows = self._conn.execute(sql, params).fetchall()
+
+        results = {"ids": [row[0] for row in rows]}
+        if "documents" in include:
+            results["documents"] = [row[1] for row in rows]
+        if "metadatas" in include:
+            results["metadatas"] = [orjson.loads(row[2]) for row in rows]
+        return results
+
+    def delete(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        with self._conn:
+            placeholders = ",".join("?" * len(ids))
+            rowids = [row[0] for row in self._conn.execute(
+                f"SELECT rowid FROM chunks WHERE chunk_id IN ({placeholders})",
+                ids)]
+            if not rowids:
+                return
+            row_placeholders = ",".join("?" * len(rowids))
+            self._conn.execute(
+                f"DELETE FROM vec_chunks WHERE rowid IN ({row_placeholders})",
+                rowids)
+            self._conn.execute(
+                f"DELETE FROM chunks WHERE rowid IN ({row_placeholders})",
+                rowids)
+
+    def close(self) -> None:
+        self._conn.close()
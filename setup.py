@@ -8,13 +8,19 @@ setup(
         'google-generativeai',
         'chromadb',
         'pypdf2',
+        'pypdfium2',
         'python-docx',
-        'pandas',
         'beautifulsoup4',
+        'lxml',
         'rich',
         'python-dotenv',
-        'tqdm'
+        'tqdm',
+        'numpy',
+        'orjson'
     ],
+    extras_require={
+        'sqlite-vec': ['sqlite-vec'],
+    },
     entry_points={
         'console_scripts': [
             'rag_sys = rag_sys.cli:main',
@@ -3,17 +3,21 @@ import os
 from datetime import datetime
 
 from rag_sys.rag import RAGSystem, DocumentInfo
+from rag_sys.conversation import ConversationStore
 from rag_sys.document_parser import DocumentParser
+from rag_sys.document_tracker import DocumentTracker
 from rag_sys.text_chunker import TextChunker
 
 
 # Mock class for embedding, to avoid API usage during tests
 class MockEmbeddingFunction:
     def __init__(self, api_key, document_mode=True):
-        pass
+        # Known texts can be given fixed vectors; everything else gets a
+        # constant one
+        self.vectors = {}
 
     def __call__(self, input):
-        return [[1.0, 2.0, 3.0] for _ in input]
+        return [self.vectors.get(text, [1.0, 2.0, 3.0]) for text in input]
 
 class TestRAGSystem(unittest.TestCase):
 
@@ -21,8 +25,11 @@ class TestRAGSystem(unittest.TestCase):
         # Set up basic env variables (just for the mock embedding)
         os.environ["GOOGLE_API_KEY"] = "test_api_key"
 
-        self.rag = RAGSystem(api_key="test_api_key", db_name="test_db")  # using mock embedding
-        self.rag.embed_fn = MockEmbeddingFunction(api_key="test_api_key")
+        # The mock is passed at construction so the collection stores
+        # vectors with the same function (and dimensions) queries use
+        self.mock_embed = MockEmbeddingFunction(api_key="test_api_key")
+        self.rag = RAGSystem(api_key="test_api_key", db_name="test_db",
+                             embedding_function=self.mock_embed)
 
         # Create sample document for testing purposes
         self.test_file = "test_file.txt"
@@ -34,7 +41,13 @@ class TestRAGSystem(unittest.TestCase):
         #Clean up the test file if it exists
         if os.path.exists(self.test_file):
             os.remove(self.test_file)
-        
+
+        # Drop the test collection so state never leaks between tests
+        try:
+            self.rag.chroma_client.delete_collection("test_db")
+        except Exception:
+            pass
+
         # Clean up test Chroma database if it exists (not available via the API, this is a workaround)
         if os.path.exists("test_db"):
             import shutil
@@ -73,11 +86,97 @@ class TestRAGSystem(unittest.TestCase):
         results = self.rag.query(query_text, n_results=1)
         self.assertTrue(len(results["results"]) > 0)  # Ensure some results are returned
 
+    def test_query_reranks_by_cosine_similarity(self):
+        # The aligned chunk is far from the query by L2 (what the ANN
+        # index ranks on) but identical in direction, so only the exact
+        # cosine rerank puts it first
+        self.mock_embed.vectors.update({
+            "far but aligned": [10.0, 0.0, 0.0],
+            "near but offset": [0.9, 0.2, 0.0],
+            "opposite": [-1.0, 0.0, 0.0],
+            "probe": [1.0, 0.0, 0.0],
+        })
+        documents = ["far but aligned", "near but offset", "opposite"]
+        self.rag._add_chunks(
+            documents,
+            [f"rerank_chunk_{i}" for i in range(len(documents))],
+            [{"source": "rerank.txt", "chunk_index": i} for i in range(len(documents))]
+        )
+
+        results = self.rag.query("probe", n_results=2)["results"]
+        self.assertEqual([r["text"] for r in results],
+                         ["far but aligned", "near but offset"])
+        similarities = [r["similarity"] for r in results]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+        self.assertAlmostEqual(similarities[0], 1.0, places=5)
+
     def test_remove_document(self):
         self.rag.process_file(self.test_file)  # first, add the file
         self.rag.remove_document(self.test_file)
         self.assertNotIn(self.test_file, self.rag.document_info)
         self.assertNotIn(self.test_file, self.rag.document_tracker.document_cache)
 
+class TestConversationStore(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = "test_conversations.db"
+        self.store = ConversationStore(db_path=self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        for suffix in ("", "-wal", "-shm"):
+            path = self.db_path + suffix
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_create_and_get_conversation(self):
+        conv_id = self.store.create_conversation("Test conversation")
+        conversation = self.store.get_conversation(conv_id)
+        self.assertEqual(conversation.title, "Test conversation")
+        self.assertEqual(conversation.messages, [])
+
+    def test_search_conversations(self):
+        conv_id = self.store.create_conversation("Python questions")
+        self.store.update_conversation(
+            conv_id,
+            [{"role": "user", "content": "What are decorators?"}],
+            "Discussion about decorators"
+        )
+        results = self.store.search_conversations("decorators")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], conv_id)
+
+        self.assertEqual(self.store.search_conversations("nonexistent"), [])
+
+
+class TestDocumentTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_file = "test_document_cache.json"
+        self.tracker = DocumentTracker(cache_file=self.cache_file)
+
+        self.test_file = "test_tracker_file.txt"
+        with open(self.test_file, 'w', encoding='utf-8') as f:
+            f.write("Some document content for tracker tests.\n")
+
+    def tearDown(self):
+        for path in (self.cache_file, self.test_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_unprocessed_document(self):
+        self.assertFalse(self.tracker.is_document_processed(self.test_file))
+
+    def test_processed_document_is_detected(self):
+        self.tracker.add_document(self.test_file, ["chunk_0"])
+        self.assertTrue(self.tracker.is_document_processed(self.test_file))
+
+    def test_modified_document_is_reprocessed(self):
+        self.tracker.add_document(self.test_file, ["chunk_0"])
+        with open(self.test_file, 'a', encoding='utf-8') as f:
+            f.write("New content invalidating the cache entry.\n")
+        self.assertFalse(self.tracker.is_document_processed(self.test_file))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file